@@ -3,8 +3,8 @@
 """
 This script is designed to automate tasks related to AWS management. It performs the following tasks:
 
-1. Checks and installs necessary AWS packages (boto3).
-2. Checks and installs necessary tools (awscli, kubectl).
+1. Checks and installs necessary AWS packages (boto3, kubernetes).
+2. Checks and installs necessary tools (awscli).
 3. Logs into AWS using AWS CLI.
 4. Collects and prints inventory of AWS resources (EC2 Instances, VPCs, S3 Buckets, EKS Clusters).
 5. Collects and prints data from specified EKS clusters (Pods, Nodes, Containers).
@@ -13,101 +13,230 @@ This script is designed to automate tasks related to AWS management. It performs
 Prerequisites:
 1. You need to have Python 3 installed on your machine.
 2. You need to have pip (Python package installer) installed.
-3. You need to have 'awscli' and 'kubectl' installed, or permissions to install them.
+3. You need to have 'awscli' installed, or permissions to install it.
 4. You need to have access to an AWS account and the necessary permissions to view and manage resources.
 5. You need to know the name of the EKS clusters you want to scan.
 """
 
 import os
+import importlib.util
+import io
+import shutil
 import subprocess
 import sys
 import csv
-import boto3
-from botocore.exceptions import NoCredentialsError, BotoCoreError
+import functools
+import http.client
+import tempfile
+import threading
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def check_aws_packages():
+    # find_spec only locates the packages, so this skips the cost of importing them
+    if all(importlib.util.find_spec(name) is not None for name in ('boto3', 'kubernetes')):
+        return
+    print("boto3 or kubernetes is not installed. Installing...")
     try:
-        import boto3
-    except ImportError:
-        print("boto3 is not installed. Installing...")
-        try:
-            subprocess.run('pip3 install boto3', shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error installing boto3: {e}")
-            sys.exit(1)
+        subprocess.run([sys.executable, '-m', 'pip', 'install', 'boto3', 'kubernetes'], check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Error installing boto3 or kubernetes: {e}")
+        sys.exit(1)
+    # Make the freshly installed packages visible to the imports below
+    importlib.invalidate_caches()
 
+# Must run before the third-party imports, otherwise a missing package fails the import first
 check_aws_packages()
 
+import boto3
+from botocore.config import Config
+from botocore.exceptions import NoCredentialsError, BotoCoreError
+from kubernetes import client as k8s_client, config as k8s_config
+
+# orjson parses large pod listings several times faster; it is optional
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Creating clients from the shared default session is not thread-safe
+client_lock = threading.Lock()
+
+# Fail fast on transient errors, and allow enough pooled connections for the parallel calls
+CLIENT_CONFIG = Config(
+    retries={'max_attempts': 2, 'mode': 'standard'},
+    read_timeout=10,
+    connect_timeout=3,
+    max_pool_connections=20,
+)
+
+# Reuse clients so service models are parsed and connection pools opened only once
+@functools.lru_cache(maxsize=None)
+def get_client(service_name):
+    with client_lock:
+        return boto3.client(service_name, config=CLIENT_CONFIG)
+
+def install_aws_cli():
+    # Download and unpack the installer in memory so nothing is left in the working directory
+    with urllib.request.urlopen('https://awscli.amazonaws.com/awscli-exe-linux-x86_64.zip') as response:
+        archive = zipfile.ZipFile(io.BytesIO(response.read()))
+    with tempfile.TemporaryDirectory() as install_dir:
+        for member in archive.infolist():
+            path = archive.extract(member, install_dir)
+            # zipfile drops the permission bits, and the installer needs its executables
+            mode = member.external_attr >> 16
+            if mode:
+                os.chmod(path, mode)
+        subprocess.run(['sudo', os.path.join(install_dir, 'aws', 'install')], check=True)
+
 def check_tools():
-    tools = {
-        'aws': ['--version'], 
-        'kubectl': ['version', '--client']
-    }
-    for tool, version_command in tools.items():
-        try:
-            subprocess.run([tool] + version_command, check=True)
-            print(f"{tool} is installed correctly.")
-        except FileNotFoundError:
-            print(f"{tool} is not installed. Installing...")
-            try:
-                if tool == 'aws':
-                    subprocess.run('pip3 uninstall -y awscli', shell=True, check=True)
-                    subprocess.run('curl "https://awscli.amazonaws.com/awscli-exe-linux-x86_64.zip" -o "awscliv2.zip"', shell=True, check=True)
-                    subprocess.run('unzip awscliv2.zip', shell=True, check=True)
-                    subprocess.run('sudo ./aws/install', shell=True, check=True)
-                elif tool == 'kubectl':
-                    subprocess.run('sudo snap install kubectl --classic', shell=True, check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Error installing {tool}: {e}")
-                sys.exit(1)
+    # Cluster data comes from the kubernetes client, so only the aws CLI is needed (for `eks get-token`).
+    # A PATH lookup is enough to detect it, no need to run it.
+    if shutil.which('aws'):
+        print("aws is installed correctly.")
+        return
+    print("aws is not installed. Installing...")
+    try:
+        subprocess.run([sys.executable, '-m', 'pip', 'uninstall', '-y', 'awscli'], check=True)
+        install_aws_cli()
+    # OSError covers a missing executable, urllib's URLError and extract/chmod failures;
+    # HTTPException covers a truncated download and BadZipFile a corrupt archive
+    except (subprocess.CalledProcessError, OSError, http.client.HTTPException, zipfile.BadZipFile) as e:
+        print(f"Error installing aws: {e}")
+        sys.exit(1)
 
 def login_aws():
     try:
-        boto3.client('sts').get_caller_identity()
+        get_client('sts').get_caller_identity()
         print("Logged into AWS successfully.")
     except (NoCredentialsError, BotoCoreError) as e:
         print(f"Error logging into AWS: {e}")
         sys.exit(1)
 
+def count_paginated(client, operation, expression):
+    # Walk every page instead of counting only the first response
+    paginator = client.get_paginator(operation)
+    pages = paginator.paginate(PaginationConfig={'PageSize': 1000})
+    return sum(1 for _ in pages.search(expression))
+
+def count_buckets(s3):
+    # Newer botocore releases can paginate ListBuckets; older ones return every bucket in one call
+    if s3.can_paginate('list_buckets'):
+        return count_paginated(s3, 'list_buckets', 'Buckets[]')
+    buckets = s3.list_buckets()['Buckets']
+    if len(buckets) >= 10000:
+        print("Warning: S3 bucket count may be truncated. Upgrade boto3 to count buckets across pages.")
+    return len(buckets)
+
 def get_inventory():
     try:
         inventory = {}
-        ec2 = boto3.client('ec2')
-        s3 = boto3.client('s3')
-        eks = boto3.client('eks')
+        ec2 = get_client('ec2')
+        s3 = get_client('s3')
+        eks = get_client('eks')
+
+        # The calls are independent, so issue them concurrently
+        tasks = [
+            ('EC2 Instances', lambda: count_paginated(ec2, 'describe_instances', 'Reservations[].Instances[]')),
+            ('VPCs', lambda: count_paginated(ec2, 'describe_vpcs', 'Vpcs[]')),
+            ('S3 Buckets', lambda: count_buckets(s3)),
+            ('EKS Clusters', lambda: len(eks.list_clusters()['clusters'])),
+        ]
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {executor.submit(fn): resource_type for resource_type, fn in tasks}
+            for future in as_completed(futures):
+                inventory[futures[future]] = future.result()
 
-        inventory['EC2 Instances'] = len(ec2.describe_instances()['Reservations'])
-        inventory['VPCs'] = len(ec2.describe_vpcs()['Vpcs'])
-        inventory['S3 Buckets'] = len(s3.list_buckets()['Buckets'])
-        inventory['EKS Clusters'] = len(eks.list_clusters()['clusters'])
+        # Keep the CSV rows in a stable order
+        inventory = {resource_type: inventory[resource_type] for resource_type, _ in tasks}
 
         return inventory
     except Exception as e:
         print(f"Error getting AWS inventory: {e}")
         sys.exit(1)
   
+def iter_k8s_items(list_func):
+    # Page through a list call and parse the raw JSON rather than building client models
+    continue_token = None
+    while True:
+        response = list_func(limit=500, _continue=continue_token, _preload_content=False)
+        body = json_loads(response.data)
+        yield from body['items']
+        continue_token = body['metadata'].get('continue')
+        if not continue_token:
+            break
+
+def count_k8s_workloads(api_client):
+    core_v1 = k8s_client.CoreV1Api(api_client)
+    nodes = sum(1 for _ in iter_k8s_items(core_v1.list_node))
+    pods = 0
+    containers = 0
+    for pod in iter_k8s_items(core_v1.list_pod_for_all_namespaces):
+        pods += 1
+        containers += len(pod.get('status', {}).get('containerStatuses', []))
+    return nodes, pods, containers
+
+# Cache cluster details so repeated runs in one session do not call the API again
+@functools.lru_cache(maxsize=256)
+def describe_cluster(cluster_name):
+    return get_client('eks').describe_cluster(name=cluster_name)['cluster']
+
+def eks_kubeconfig(region, cluster_name):
+    # Mirrors the cluster, user and context entries `aws eks update-kubeconfig` writes, built in memory.
+    # --output json keeps get-token parseable whatever the CLI's default output format is.
+    exec_config = {
+        'apiVersion': 'client.authentication.k8s.io/v1beta1',
+        'command': 'aws',
+        'args': ['--region', region, 'eks', 'get-token', '--cluster-name', cluster_name, '--output', 'json'],
+    }
+    # Like update-kubeconfig, pin the token command to the profile in use
+    profile = os.environ.get('AWS_PROFILE')
+    if profile:
+        exec_config['env'] = [{'name': 'AWS_PROFILE', 'value': profile}]
+
+    cluster = describe_cluster(cluster_name)
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'clusters': [{
+            'name': cluster_name,
+            'cluster': {
+                'server': cluster['endpoint'],
+                'certificate-authority-data': cluster['certificateAuthority']['data'],
+            },
+        }],
+        'users': [{
+            'name': cluster_name,
+            'user': {'exec': exec_config},
+        }],
+        'contexts': [{'name': cluster_name, 'context': {'cluster': cluster_name, 'user': cluster_name}}],
+        'current-context': cluster_name,
+    }
+
+def collect_eks_cluster(region, cluster_name):
+    with k8s_config.new_client_from_config_dict(eks_kubeconfig(region, cluster_name)) as api_client:
+        nodes, pods, containers = count_k8s_workloads(api_client)
+
+    return {
+        'Cluster Name': cluster_name,
+        'Nodes': nodes,
+        'Pods': pods,
+        'Containers': containers,
+    }
+
 def get_eks_data():
     clusters_data = []
     try:
-        eks = boto3.client('eks')
+        eks = get_client('eks')
         clusters = eks.list_clusters()['clusters']
+        if not clusters:
+            return clusters_data
 
-        for cluster_name in clusters:
-            cmd = f'aws eks update-kubeconfig --region {eks.describe_cluster(name=cluster_name)["cluster"]["arn"].split(":")[3]} --name {cluster_name}'
-            subprocess.run(cmd, shell=True, check=True)
-            subprocess.run('kubectl config view --merge --flatten > kubeconfig.yaml', shell=True, check=True)
-            os.environ["KUBECONFIG"] = os.getcwd() + "/kubeconfig.yaml"
-
-            nodes = subprocess.check_output('kubectl get nodes --no-headers | wc -l', shell=True).decode().strip()
-            pods = subprocess.check_output('kubectl get pods --all-namespaces --no-headers | wc -l', shell=True).decode().strip()
-            containers = subprocess.check_output('kubectl get pods --all-namespaces -o jsonpath="{..status.containerStatuses[].name}" | tr " " "\n" | wc -l', shell=True).decode().strip()
-
-            clusters_data.append({
-                'Cluster Name': cluster_name,
-                'Nodes': nodes,
-                'Pods': pods,
-                'Containers': containers,
-            })
+        # list_clusters is regional, so every cluster lives in the client's region
+        region = eks.meta.region_name
+        with ThreadPoolExecutor(max_workers=min(8, len(clusters))) as executor:
+            clusters_data = list(executor.map(lambda name: collect_eks_cluster(region, name), clusters))
 
     except Exception as e:
         print(f"Error getting EKS data: {e}")
@@ -115,21 +244,26 @@ def get_eks_data():
     
     return clusters_data
 
+def write_csv(path, fieldnames, rows):
+    # Render the whole file in memory and write it with a single call
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    with open(path, 'w', newline='') as csvfile:
+        csvfile.write(buffer.getvalue())
+
 if __name__ == "__main__":
     check_tools()
     login_aws()
-    inventory = get_inventory()
-    eks_data = get_eks_data()
-
-    with open('aws_inventory.csv', 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=['Resource Type', 'Count'])
-        writer.writeheader()
-        for resource_type, count in inventory.items():
-            writer.writerow({'Resource Type': resource_type, 'Count': count})
-    
-    with open('eks_data.csv', 'w', newline='') as csvfile:
-        fieldnames = ['Cluster Name', 'Nodes', 'Pods', 'Containers']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for cluster_data in eks_data:
-            writer.writerow(cluster_data)
+
+    # Inventory and EKS collection are independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        inventory_future = executor.submit(get_inventory)
+        eks_data_future = executor.submit(get_eks_data)
+        inventory = inventory_future.result()
+        eks_data = eks_data_future.result()
+
+    write_csv('aws_inventory.csv', ['Resource Type', 'Count'],
+              ({'Resource Type': resource_type, 'Count': count} for resource_type, count in inventory.items()))
+    write_csv('eks_data.csv', ['Cluster Name', 'Nodes', 'Pods', 'Containers'], eks_data)
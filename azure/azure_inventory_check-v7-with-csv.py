@@ -4,8 +4,8 @@
 This script is designed to automate tasks related to Azure management. It performs the following tasks:
 
 1. Checks and installs necessary Azure packages (azure-identity, azure-mgmt-resource, azure-mgmt-compute,
-   azure-mgmt-network, azure-mgmt-storage, azure-mgmt-containerservice).
-2. Checks and installs necessary tools (az, kubectl).
+   azure-mgmt-network, azure-mgmt-storage, azure-mgmt-containerservice) and the kubernetes client.
+2. Checks and installs necessary tools (az).
 3. Logs into Azure using InteractiveBrowserCredential.
 4. Collects and prints inventory of Azure resources (VMs, Networks, Storage Accounts, AKS Clusters).
 5. Collects and prints data from specified AKS clusters (Pods, Nodes, Containers).
@@ -15,62 +15,79 @@ This script is designed to automate tasks related to Azure management. It perfor
 Prerequisites:
 1. You need to have Python 3 installed on your machine.
 2. You need to have pip (Python package installer) installed.
-3. You need to have 'az' (Azure CLI) and 'kubectl' installed, or permissions to install them.
+3. You need to have 'az' (Azure CLI) installed, or permissions to install it.
 4. You need to have access to an Azure subscription and the necessary permissions to view and manage resources.
 5. You need to know the name and resource group of the AKS clusters you want to scan.
 
 """
 
 import os
+import importlib.util
+import io
 import subprocess
 import sys
 import re
 import csv
+import shutil
 import getpass
-from azure.identity import InteractiveBrowserCredential
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.mgmt.storage import StorageManagementClient
-from azure.mgmt.containerservice import ContainerServiceClient
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Azure subscription IDs are GUIDs
+SUBSCRIPTION_ID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+
+
+# Check whether a module can be imported without actually importing it
+def is_package_installed(module_name):
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ModuleNotFoundError:
+        # find_spec raises when a parent package such as 'azure' is missing
+        return False
 
 
 # Check if azure and azure-mgmt is installed
 def check_azure_packages():
+    if all(is_package_installed(name) for name in ('azure.identity', 'azure.mgmt.compute', 'kubernetes')):
+        return
+    print("azure, azure-mgmt or kubernetes is not installed. Installing...")
     try:
-        import azure.mgmt.compute
-        import azure
-    except ImportError:
-        print("azure or azure-mgmt is not installed. Installing...")
-        try:
-            subprocess.run('pip3 install azure-identity azure-mgmt-resource azure-mgmt-compute azure-mgmt-network azure-mgmt-storage azure-mgmt-containerservice', shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error installing azure, azure-mgmt or azure-identity: {e}")
-            sys.exit(1)
-
-# Call the function to check and install azure packages
+        subprocess.run([sys.executable, '-m', 'pip', 'install', 'azure-identity', 'azure-mgmt-resource', 'azure-mgmt-compute', 'azure-mgmt-network', 'azure-mgmt-storage', 'azure-mgmt-containerservice', 'kubernetes'], check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Error installing azure, azure-mgmt, azure-identity or kubernetes: {e}")
+        sys.exit(1)
+    # Make the freshly installed packages visible to the imports below
+    importlib.invalidate_caches()
+
+# Call the function to check and install azure packages.
+# Must run before the third-party imports, otherwise a missing package fails the import first.
 check_azure_packages()
 
+from azure.identity import InteractiveBrowserCredential
+from kubernetes import client as k8s_client, config as k8s_config
+
+# orjson parses large pod listings several times faster; it is optional
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 
 # Check if the required tools are installed
 def check_tools():
-    tools = {
-        'az': ['--version'], 
-        'kubectl': ['version', '--client']
-    }
-    for tool, version_command in tools.items():
-        try:
-            subprocess.run([tool] + version_command, check=True, stdout=subprocess.PIPE)
-        except FileNotFoundError:
-            print(f"{tool} is not installed. Installing...")
-            try:
-                if tool == 'az':
-                    subprocess.run('curl -sL https://aka.ms/InstallAzureCLIDeb | sudo bash', shell=True, check=True)
-                elif tool == 'kubectl':
-                    subprocess.run('sudo snap install kubectl --classic', shell=True, check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Error installing {tool}: {e}")
-                sys.exit(1)
+    # Cluster data comes from the kubernetes client, so only az is needed (for `aks get-credentials`).
+    # A PATH lookup is enough to detect it, no need to run it.
+    if shutil.which('az'):
+        return
+    print("az is not installed. Installing...")
+    try:
+        # Feed the install script to bash directly instead of piping through a shell
+        script = subprocess.run(['curl', '-sL', 'https://aka.ms/InstallAzureCLIDeb'], check=True, stdout=subprocess.PIPE).stdout
+        subprocess.run(['sudo', 'bash'], input=script, check=True)
+    # OSError covers a missing curl or sudo (FileNotFoundError)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Error installing az: {e}")
+        sys.exit(1)
 
 
 def login_azure():
@@ -78,44 +95,97 @@ def login_azure():
     subscription_id = input().strip()
 
     # Optional: validate subscription ID
-    if not re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', subscription_id, re.I):
+    if not SUBSCRIPTION_ID_RE.match(subscription_id):
         print("Invalid subscription ID.")
         sys.exit(1)
         
     try:
         credential = InteractiveBrowserCredential()
+        # Sign in once before get_inventory fans out; otherwise every concurrent request
+        # finds no cached token and opens its own browser login
+        credential.authenticate(scopes=['https://management.azure.com/.default'])
     except Exception as e:
         print(f"Error logging into Azure: {e}")
         sys.exit(1)
     return credential, subscription_id
 
 
+# Reuse management clients so each one is constructed only once per subscription
+@functools.lru_cache(maxsize=None)
+def get_mgmt_client(client_class, credential, subscription_id):
+    return client_class(credential, subscription_id)
+
+
+# Count the items of an Azure paged iterator without keeping them in memory.
+# by_page() yields iterators rather than lists, so the items are still counted one by one.
+def count_paged(paged):
+    return sum(1 for _ in paged)
+
+
 # Get Azure inventory
 from azure.core.exceptions import HttpResponseError
 
 def get_inventory(credential, subscription_id):
-    try:
-        inventory = {}
-        resource_client = ResourceManagementClient(credential, subscription_id)
-        compute_client = ComputeManagementClient(credential, subscription_id)
-        network_client = NetworkManagementClient(credential, subscription_id)
-        storage_client = StorageManagementClient(credential, subscription_id)
-        containerservice_client = ContainerServiceClient(credential, subscription_id)
-
-        inventory['VMs'] = len(list(compute_client.virtual_machines.list_all()))
-        inventory['Networks'] = len(list(network_client.virtual_networks.list_all()))
-        inventory['Storage Accounts'] = len(list(storage_client.storage_accounts.list()))
-        inventory['AKS Clusters'] = len(list(containerservice_client.managed_clusters.list()))
-
-        return inventory
-    except Exception as e:
-        print(f"Error getting Azure inventory: {e}")
-        sys.exit(1)
-  
+    # The management SDKs are slow to import, so load them only once they are needed
+    from azure.mgmt.resource import ResourceManagementClient
+    from azure.mgmt.compute import ComputeManagementClient
+    from azure.mgmt.network import NetworkManagementClient
+    from azure.mgmt.storage import StorageManagementClient
+    from azure.mgmt.containerservice import ContainerServiceClient
+
+    # Errors propagate to the caller: this runs in a background thread, where printing
+    # would interrupt the AKS prompts and sys.exit would not stop the script
+    inventory = {}
+    resource_client = get_mgmt_client(ResourceManagementClient, credential, subscription_id)
+    compute_client = get_mgmt_client(ComputeManagementClient, credential, subscription_id)
+    network_client = get_mgmt_client(NetworkManagementClient, credential, subscription_id)
+    storage_client = get_mgmt_client(StorageManagementClient, credential, subscription_id)
+    containerservice_client = get_mgmt_client(ContainerServiceClient, credential, subscription_id)
+
+    # The calls are independent, so issue them concurrently
+    tasks = [
+        ('VMs', lambda: count_paged(compute_client.virtual_machines.list_all())),
+        ('Networks', lambda: count_paged(network_client.virtual_networks.list_all())),
+        ('Storage Accounts', lambda: count_paged(storage_client.storage_accounts.list())),
+        ('AKS Clusters', lambda: count_paged(containerservice_client.managed_clusters.list())),
+    ]
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {executor.submit(fn): resource_type for resource_type, fn in tasks}
+        for future in as_completed(futures):
+            inventory[futures[future]] = future.result()
+
+    # Keep the CSV rows in a stable order
+    inventory = {resource_type: inventory[resource_type] for resource_type, _ in tasks}
+
+    return inventory
+
+def iter_k8s_items(list_func):
+    # Page through a list call and parse the raw JSON rather than building client models
+    continue_token = None
+    while True:
+        response = list_func(limit=500, _continue=continue_token, _preload_content=False)
+        body = json_loads(response.data)
+        yield from body['items']
+        continue_token = body['metadata'].get('continue')
+        if not continue_token:
+            break
+
+def count_k8s_workloads(api_client):
+    core_v1 = k8s_client.CoreV1Api(api_client)
+    nodes = sum(1 for _ in iter_k8s_items(core_v1.list_node))
+    pods = 0
+    containers = 0
+    for pod in iter_k8s_items(core_v1.list_pod_for_all_namespaces):
+        pods += 1
+        containers += len(pod.get('status', {}).get('containerStatuses', []))
+    return nodes, pods, containers
+
 def get_aks_data(credential, subscription_id):
+    from azure.mgmt.containerservice import ContainerServiceClient
+
     clusters_data = []  # List to store data of all clusters
     try:
-        containerservice_client = ContainerServiceClient(credential, subscription_id)
+        containerservice_client = get_mgmt_client(ContainerServiceClient, credential, subscription_id)
         clusters = [c.name for c in containerservice_client.managed_clusters.list()]
 
         while True:
@@ -127,28 +197,14 @@ def get_aks_data(credential, subscription_id):
                 print("Enter the Resource Group of the AKS cluster:")
                 resource_group = input().strip()
                 print(f"Getting data for {cluster_name}...")
-                cmd = f'az aks get-credentials --resource-group {resource_group} --name {cluster_name}'
-                result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                cmd = ['az', 'aks', 'get-credentials', '--resource-group', resource_group, '--name', cluster_name]
+                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
                 if result.returncode != 0:
-                    print(f"Error running '{cmd}'. Please check the resource group and cluster name.\nError details: {result.stderr.decode()}")
+                    print(f"Error running '{' '.join(cmd)}'. Please check the resource group and cluster name.\nError details: {result.stderr.decode()}")
                 else:
-                    subprocess.run('kubectl config view --merge --flatten', shell=True, check=True)
-                    subprocess.run('kubectl get pods --all-namespaces', shell=True, check=True)
-
-                    # count nodes
-                    cmd = 'kubectl get nodes --no-headers | wc -l'
-                    result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    nodes = result.stdout.decode().strip()
-
-                    # count pods
-                    cmd = 'kubectl get pods --all-namespaces --no-headers | wc -l'
-                    result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    pods = result.stdout.decode().strip()
-
-                    # count containers
-                    cmd = 'kubectl get pods --all-namespaces -o jsonpath="{..status.containerStatuses[].name}" | tr " " "\n" | wc -l'
-                    result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    containers = result.stdout.decode().strip()
+                    # count nodes, pods and containers through the cluster's current context
+                    with k8s_config.new_client_from_config() as api_client:
+                        nodes, pods, containers = count_k8s_workloads(api_client)
 
                     # Add cluster data to the list
                     clusters_data.append({
@@ -166,23 +222,33 @@ def get_aks_data(credential, subscription_id):
     
     return clusters_data  # Return list of cluster data
 
+def write_csv(path, fieldnames, rows):
+    # Render the whole file in memory and write it with a single call
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    with open(path, 'w', newline='') as csvfile:
+        csvfile.write(buffer.getvalue())
+
 if __name__ == "__main__":
     check_tools()
     credential, subscription_id = login_azure()
-    inventory = get_inventory(credential, subscription_id)
-    aks_data = get_aks_data(credential, subscription_id)
+
+    # Count the inventory in the background while the user picks AKS clusters to scan
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        inventory_future = executor.submit(get_inventory, credential, subscription_id)
+        aks_data = get_aks_data(credential, subscription_id)
+
+    # Write AKS data to CSV first, so a failed inventory does not discard the scanned clusters
+    write_csv('aks_data.csv', ['Cluster Name', 'Nodes', 'Pods', 'Containers'], aks_data)
+
+    try:
+        inventory = inventory_future.result()
+    except Exception as e:
+        print(f"Error getting Azure inventory: {e}")
+        sys.exit(1)
 
     # Write inventory to CSV
-    with open('azure_inventory.csv', 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=['Resource Type', 'Count'])
-        writer.writeheader()
-        for resource_type, count in inventory.items():
-            writer.writerow({'Resource Type': resource_type, 'Count': count})
-    
-    # Write AKS data to CSV
-    with open('aks_data.csv', 'w', newline='') as csvfile:
-        fieldnames = ['Cluster Name', 'Nodes', 'Pods', 'Containers']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for cluster_data in aks_data:
-            writer.writerow(cluster_data)
\ No newline at end of file
+    write_csv('azure_inventory.csv', ['Resource Type', 'Count'],
+              ({'Resource Type': resource_type, 'Count': count} for resource_type, count in inventory.items()))
\ No newline at end of file